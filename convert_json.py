@@ -1,19 +1,67 @@
 import json
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 from pathlib import Path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def json_to_excel_with_sheets(input_file: str, output_filename: str = "output.xlsx") -> None:
+# Output column order; the last three hold lists that get joined into strings
+COLUMNS = [
+    "year", "date", "url", "venue", "band", "songs", "category", "act_type",
+    "show_id", "date_from_title", "date_is_placeholder", "setlist", "musicians", "notes"
+]
+
+def _as_list(value: Any) -> list:
+    """
+    Returns value if it is a list, otherwise an empty list (covers missing/null fields)
+    """
+    return value if isinstance(value, list) else []
+
+def _format_musicians(musicians: list) -> str:
+    """
+    Formats musicians as "name - instrument" pairs separated by commas
+    """
+    # Improved musician string formatting with error handling
+    return ", ".join(
+        f"{m.get('name', 'Unknown')}" +
+        (f" - {m.get('instrument')}" if m.get('instrument') else "")
+        for m in musicians
+    )
+
+def _year_to_dataframe(year: str, data: list) -> pd.DataFrame:
+    """
+    Flattens one year's events into a DataFrame with the COLUMNS layout
+    """
+    # Fill one plain list per column so pandas can build each Series directly
+    columns = {col: [] for col in COLUMNS[1:]}
+    scalar_columns = [(col, columns[col]) for col in COLUMNS[1:-3]]
+    setlists, musicians, notes = columns["setlist"], columns["musicians"], columns["notes"]
+
+    for item in data:
+        # Missing scalar fields become "" (blank cells, as before)
+        for col, values in scalar_columns:
+            value = item.get(col)
+            values.append("" if value is None else value)
+
+        # More concise list-to-string conversions with safe defaults
+        setlists.append(", ".join(_as_list(item.get('setlist'))))
+        musicians.append(_format_musicians(_as_list(item.get('musicians'))))
+        notes.append(", ".join(_as_list(item.get('notes'))))
+
+    return pd.DataFrame({"year": year, **columns})
+
+def json_to_excel_with_sheets(input_file: str, output_filename: str = "output.xlsx", parquet_dir: Optional[str] = None, write_excel: bool = True) -> None:
     """
-    Converts JSON concert data from a file to an Excel workbook with separate sheets for each year.
+    Converts JSON concert data from a file to an Excel workbook with separate sheets for each year,
+    and optionally to a Parquet dataset partitioned by year.
     
     Args:
         input_file (str): Path to the input JSON file
         output_filename (str): Path for the output Excel file
+        parquet_dir (Optional[str]): Directory for the Parquet dataset, skipped if None
+        write_excel (bool): Whether to write the Excel workbook
     
     Raises:
         FileNotFoundError: If the input file doesn't exist
@@ -26,46 +74,35 @@ def json_to_excel_with_sheets(input_file: str, output_filename: str = "output.xl
         
         with open(input_path, 'r', encoding='utf-8') as f:
             json_data = json.load(f)
-        
-        output_path = Path(output_filename)
-        logging.info(f"Writing Excel file to {output_path}")
-
-        with pd.ExcelWriter(output_path) as writer:
-            for year, data in json_data.items():
-                rows = []
-                for item in data:
-                    # Improved musician string formatting with error handling
-                    musicians_str = ", ".join(
-                        f"{m.get('name', 'Unknown')}" + 
-                        (f" - {m.get('instrument')}" if m.get('instrument') else "")
-                        for m in item.get('musicians', [])
-                    )
-                    
-                    # More concise list-to-string conversions with safe defaults
-                    row = {
-                        "year": year,
-                        "date": item.get("date", ""),
-                        "url": item.get("url", ""),
-                        "venue": item.get("venue", ""),
-                        "band": item.get("band", ""),
-                        "songs": item.get("songs", ""),
-                        "category": item.get("category", ""),
-                        "act_type": item.get("act_type", ""),
-                        "show_id": item.get("show_id", ""),
-                        "date_from_title": item.get("date_from_title", ""),
-                        "date_is_placeholder": item.get("date_is_placeholder", ""),
-                        "setlist": ", ".join(item.get('setlist', [])),
-                        "musicians": musicians_str,
-                        "notes": ", ".join(item.get('notes', []))
-                    }
-                    rows.append(row)
-
-                if rows:  # Only create sheet if there's data
-                    df = pd.DataFrame(rows)
-                    logging.info(f"Creating sheet for year {year} with {len(rows)} entries")
+
+        # Only create sheets for years that have data
+        frames = {
+            year: _year_to_dataframe(year, data)
+            for year, data in json_data.items()
+            if data
+        }
+
+        if write_excel:
+            output_path = Path(output_filename)
+            logging.info(f"Writing Excel file to {output_path}")
+
+            # Skip auto-linking the url columns; constant_memory is left off since pandas writes column by column
+            with pd.ExcelWriter(output_path, engine='xlsxwriter', engine_kwargs={'options': {'strings_to_urls': False}}) as writer:
+                for year, df in frames.items():
+                    logging.info(f"Creating sheet for year {year} with {len(df)} entries")
                     df.to_excel(writer, sheet_name=str(year), index=False)
 
-        logging.info("Excel file created successfully")
+            logging.info("Excel file created successfully")
+
+        if parquet_dir and frames:
+            logging.info(f"Writing Parquet dataset to {parquet_dir}")
+            # Un-enriched events still carry venue/band dicts; store them as text like the Excel cells
+            pd.concat(frames.values(), ignore_index=True).astype(str).to_parquet(
+                parquet_dir, partition_cols=["year"], compression="zstd", index=False,
+                # Replace each year's partition on re-runs instead of appending another part file
+                existing_data_behavior="delete_matching"
+            )
+            logging.info("Parquet dataset created successfully")
 
     except FileNotFoundError:
         logging.error(f"Input file not found: {input_file}")
@@ -81,8 +118,10 @@ if __name__ == "__main__":
     # Example usage with the new file
     input_file = "event_data_detailed.json"
     output_file = "concert_data.xlsx"
+    parquet_dir = "concert_data"
+    WRITE_EXCEL = True
     
     try:
-        json_to_excel_with_sheets(input_file, output_file)
+        json_to_excel_with_sheets(input_file, output_file, parquet_dir=parquet_dir, write_excel=WRITE_EXCEL)
     except Exception as e:
         logging.error(f"Failed to convert JSON to Excel: {str(e)}")
\ No newline at end of file
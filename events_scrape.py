@@ -4,16 +4,18 @@ Scrapes each event detailed page
 loading the events data 
 """
 
-import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-import json
-from typing import Dict, Any
-import copy
+from concurrent.futures import Executor, ProcessPoolExecutor
+from selectolax.lexbor import LexborHTMLParser
+import hashlib
+import orjson
+from typing import Dict, Any, Optional, Tuple
 from tqdm import tqdm
 import logging
+import multiprocessing
 import os
 from datetime import datetime
+import httpx
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,77 +23,166 @@ logging.basicConfig(
     filename='scraping.log'
 )
 
-async def extract_event_data(session: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
+# httpx logs every request at INFO; keep scraping.log to errors and checkpoint notices
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
+
+# CSS selectors for the event page, evaluated by lexbor in C
+SEL_TITLE = 'title'
+SEL_H4_INLINE = 'h4[style="display: inline;"]'
+SEL_MUTED = 'span.text-muted'
+SEL_H4 = 'h4'
+SEL_SIMPLE_CARD = 'div#simple-card'
+# bs4's find_all('a', class_='') matched anchors with no class attribute as well as an empty one
+SEL_SONG_LINKS = 'a:not([class]), a[class=""]'
+SEL_DATATABLE = 'table[id^="datatable_"]'
+SEL_MUSICIANS = 'div#musicians-content'
+SEL_NOTES_CONTAINER = 'div.notes-container'
+
+def _cache_paths(cache_dir: str, url: str) -> Tuple[str, str]:
+    """
+    Paths of the validator metadata and the page body cached for an event page
+    """
+    key = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest())
+    return key + '.json', key + '.html'
+
+def _load_cache_entry(cache_dir: str, url: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a cached event page and its validators, returning None if either is missing or unreadable
+    """
+    meta_path, body_path = _cache_paths(cache_dir, url)
+    try:
+        with open(meta_path, 'rb') as f:
+            entry = orjson.loads(f.read())
+        with open(body_path, 'rb') as f:
+            entry['content'] = f.read()
+        return entry
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+def _save_cache_entry(cache_dir: str, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+    """
+    Cache an event page body with its validators; the metadata is written last so it never points at a missing body
+    """
+    meta_path, body_path = _cache_paths(cache_dir, url)
+    _write_atomic(body_path, content)
+    _write_json(meta_path, {'etag': etag, 'last_modified': last_modified})
+
+def parse_event_page(content: bytes) -> Dict[str, Any]:
+    """
+    Extract event data from the raw HTML of an event page
+
+    Kept at module level so it can be pickled and run in a worker process.
+    """
+    # encoding=True sniffs BOM/<meta charset> instead of assuming UTF-8 (a no-op for UTF-8 pages)
+    tree = LexborHTMLParser(content, encoding=True)
+    event_data = {}
+
+    # Event Date (and indication of placeholder)
+    title = tree.css_first(SEL_TITLE).text()
+    event_data['date_from_title'] = title.split(" ")[0]
+    h4_date = tree.css_first(SEL_H4_INLINE)
+    event_data['date'] = h4_date.text().strip() if h4_date else None
+    placeholder_text = tree.css_first(SEL_MUTED)
+    event_data['date_is_placeholder'] = placeholder_text.text().strip() if placeholder_text else "Date might be accurate"
+
+    # Event Name/Band
+    event_data['band'] = title.split(" ", 1)[1]
+
+    # Venue
+    venue_h4 = next((h4 for h4 in tree.css(SEL_H4) if (
+        "Analy High School" in h4.text() or
+        "Warfield Theatre" in h4.text()
+    )), None)
+    event_data['venue'] = venue_h4.text().strip() if venue_h4 else None
+
+    # Setlist
+    setlist = []
+    partial_set_div = tree.css_first(SEL_SIMPLE_CARD)
+    if partial_set_div:
+        for song_link in partial_set_div.css(SEL_SONG_LINKS):
+            setlist.append(song_link.text().strip())
+    
+    if not setlist:
+        table_setlist = tree.css_first(SEL_DATATABLE)
+        if table_setlist:
+            for row in table_setlist.css('tr'):
+                song_cell = row.css_first('a')
+                if song_cell:
+                    setlist.append(song_cell.text().strip())
+    
+    event_data['setlist'] = setlist
+
+    # Musicians (read the text nodes directly instead of serializing the subtree and re-splitting it)
+    musicians_div = tree.css_first(SEL_MUSICIANS)
+    musicians = []
+    if musicians_div:
+        lines = [
+            line
+            for node in musicians_div.traverse(include_text=True)
+            if node.tag == '-text'
+            for line in map(str.strip, node.text_content.splitlines())
+            if line
+        ]
+        i = 0
+        while i < len(lines):
+            musician_name = lines[i]
+            if i + 1 < len(lines):
+                instrument = lines[i + 1].strip('- ')
+                musicians.append({'name': musician_name, 'instrument': instrument})
+                i += 2
+            else:
+                musicians.append({'name': musician_name, 'instrument': 'unknown'})
+                i += 1
+    event_data['musicians'] = musicians
+
+    # Notes
+    notes_container = tree.css_first(SEL_NOTES_CONTAINER)
+    notes = []
+    if notes_container:
+        for li in notes_container.css('li'):
+            notes.append(li.text().strip())
+    event_data['notes'] = notes
+
+    return event_data
+
+async def extract_event_data(client: httpx.AsyncClient, url: str, cache_dir: Optional[str] = None, executor: Optional[Executor] = None) -> Dict[str, Any]:
     """
     Asynchronously extract data from an event page
+
+    If cache_dir is set, the page is requested conditionally with the cached ETag/Last-Modified
+    and a 304 re-parses the cached body instead of downloading the page again.
+    If executor is set, the page is parsed there instead of on the event loop.
     """
     try:
-        async with session.get(url) as response:
+        cached = await asyncio.to_thread(_load_cache_entry, cache_dir, url) if cache_dir else None
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = await client.get(url, headers=headers)
+        if cached and response.status_code == 304:
+            # Parse the cached body again so parser fixes also reach pages that haven't changed
+            content = cached['content']
+        else:
             response.raise_for_status()
-            content = await response.text()
-            
-        soup = BeautifulSoup(content, 'html.parser')
-        event_data = {}
-
-        # Event Date (and indication of placeholder)
-        event_data['date_from_title'] = soup.title.text.split(" ")[0]
-        h4_date = soup.find('h4', style='display: inline;')
-        event_data['date'] = h4_date.text.strip() if h4_date else None
-        placeholder_text = soup.find('span', class_='text-muted')
-        event_data['date_is_placeholder'] = placeholder_text.text.strip() if placeholder_text else "Date might be accurate"
-
-        # Event Name/Band
-        event_data['band'] = soup.title.text.split(" ", 1)[1]
-
-        # Venue
-        venue_h4 = soup.find('h4', string=lambda text: text and (
-            "Analy High School" in text or 
-            "Warfield Theatre" in text
-        ))
-        event_data['venue'] = venue_h4.text.strip() if venue_h4 else None
-
-        # Setlist
-        setlist = []
-        partial_set_div = soup.find('div', id='simple-card')
-        if partial_set_div:
-            song_links = partial_set_div.find_all('a', class_='')
-            for song_link in song_links:
-                setlist.append(song_link.text.strip())
-        
-        if not setlist:
-            table_setlist = soup.find('table', id=lambda x: x and x.startswith('datatable_'))
-            if table_setlist:
-                for row in table_setlist.find_all('tr'):
-                    song_cell = row.find('a')
-                    if song_cell:
-                        setlist.append(song_cell.text.strip())
-        
-        event_data['setlist'] = setlist
-
-        # Musicians
-        musicians_div = soup.find('div', id='musicians-content')
-        musicians = []
-        if musicians_div:
-            lines = musicians_div.get_text(strip=True).splitlines()
-            i = 0
-            while i < len(lines):
-                musician_name = lines[i]
-                if i + 1 < len(lines):
-                    instrument = lines[i + 1].strip('- ')
-                    musicians.append({'name': musician_name, 'instrument': instrument})
-                    i += 2
-                else:
-                    musicians.append({'name': musician_name, 'instrument': 'unknown'})
-                    i += 1
-        event_data['musicians'] = musicians
-
-        # Notes
-        notes_container = soup.find('div', class_='notes-container')
-        notes = []
-        if notes_container:
-            for li in notes_container.find_all('li'):
-                notes.append(li.text.strip())
-        event_data['notes'] = notes
+            content = response.content
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+            # Only pages with validators can be revalidated on the next run
+            if cache_dir and (etag or last_modified):
+                await asyncio.to_thread(_save_cache_entry, cache_dir, url, content, etag, last_modified)
+
+        if executor:
+            loop = asyncio.get_running_loop()
+            event_data = await loop.run_in_executor(executor, parse_event_page, content)
+        else:
+            event_data = parse_event_page(content)
 
         return event_data
 
@@ -99,7 +190,22 @@ async def extract_event_data(session: aiohttp.ClientSession, url: str) -> Dict[s
         logging.error(f"Error processing {url}: {str(e)}")
         return None
 
-async def process_events_data(input_file: str, output_file: str, max_concurrent: int = 10, delay_before_request: float = 0.2, checkpoint_interval: int = 500) -> None:
+def _write_atomic(path: str, content: bytes) -> None:
+    """
+    Write content via a temp file so a crash never leaves a partial file at path
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """
+    Atomically write data as indented JSON
+    """
+    _write_atomic(path, orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+async def process_events_data(input_file: str, output_file: str, max_concurrent: int = 10, delay_before_request: float = 0.2, checkpoint_interval: int = 500, max_retries: int = 2, cache_dir: Optional[str] = None) -> None:
     """
     Asynchronously process all events with a progress bar and checkpointing
     
@@ -107,53 +213,68 @@ async def process_events_data(input_file: str, output_file: str, max_concurrent:
         input_file: Path to input JSON file
         output_file: Path to output JSON file
         max_concurrent: Maximum number of concurrent requests
-        delay_before_request: Delay between requests
+        delay_before_request: Delay before retrying a failed request
         checkpoint_interval: Number of events to process before saving checkpoint
+        max_retries: Number of times to retry a failed request
+        cache_dir: Directory for the per-page HTTP cache, disabled if None
     """
     # Create checkpoints directory if it doesn't exist
     checkpoint_dir = "checkpoints"
     os.makedirs(checkpoint_dir, exist_ok=True)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
 
     # Load from latest checkpoint if exists, otherwise load original data
-    checkpoint_files = sorted([f for f in os.listdir(checkpoint_dir) if f.startswith('checkpoint_')])
+    # (read as bytes so orjson decodes the UTF-8 it wrote, whatever the locale's default encoding)
+    checkpoint_files = sorted([f for f in os.listdir(checkpoint_dir) if f.startswith('checkpoint_') and f.endswith('.json')])
     
     if checkpoint_files:
         latest_checkpoint = os.path.join(checkpoint_dir, checkpoint_files[-1])
         logging.info(f"Loading from checkpoint: {latest_checkpoint}")
-        with open(latest_checkpoint, 'r') as f:
-            updated_data = json.load(f)
+        with open(latest_checkpoint, 'rb') as f:
+            updated_data = orjson.loads(f.read())
     else:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
-        updated_data = copy.deepcopy(data)
+        with open(input_file, 'rb') as f:
+            updated_data = orjson.loads(f.read())
 
-    # Create semaphore for rate limiting
-    semaphore = asyncio.Semaphore(max_concurrent)
-    
-    # Collect all events that need processing
+    # Collect all events that need processing (each event is the dict stored in updated_data)
     events_to_process = []
-    for year, events in data.items():
+    for year, events in updated_data.items():
         if not isinstance(events, list):
             continue
         for i, event in enumerate(events):
             if 'url' in event:
                 events_to_process.append((year, i, event))
 
-    async with aiohttp.ClientSession() as session:
-        # Create progress bar
-        pbar = tqdm(total=len(events_to_process), desc="Processing events")
+    # HTTP/2 multiplexes every worker's requests over one connection; the pool size only
+    # comes into play if the server falls back to HTTP/1.1
+    limits = httpx.Limits(
+        max_connections=max_concurrent,
+        max_keepalive_connections=max_concurrent,
+        keepalive_expiry=60
+    )
+
+    # Parse pages on all cores while the event loop keeps issuing requests; workers are spawned
+    # rather than forked because to_thread has already started threads by the time they launch
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn')) as executor:
+        async with httpx.AsyncClient(http2=True, limits=limits, timeout=30, follow_redirects=True) as client:
+            # Create progress bar
+            pbar = tqdm(total=len(events_to_process), desc="Processing events")
         
-        processed_count = 0
+            processed_count = 0
         
-        # Process events with semaphore
-        async def process_event(year: str, index: int, event: Dict[str, Any]):
-            nonlocal processed_count
-            async with semaphore:
+            # Process a single event
+            async def process_event(year: str, index: int, event: Dict[str, Any]):
+                nonlocal processed_count
                 try:
-                    await asyncio.sleep(delay_before_request)
-                    detailed_data = await extract_event_data(session, event['url'])
+                    detailed_data = await extract_event_data(client, event['url'], cache_dir, executor)
+                    for _ in range(max_retries):
+                        if detailed_data:
+                            break
+                        await asyncio.sleep(delay_before_request)
+                        detailed_data = await extract_event_data(client, event['url'], cache_dir, executor)
                     if detailed_data:
-                        updated_data[year][index] = {**event, **detailed_data}
+                        event.update(detailed_data)
                     
                     processed_count += 1
                     
@@ -164,32 +285,44 @@ async def process_events_data(input_file: str, output_file: str, max_concurrent:
                             f'checkpoint_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
                         )
                         logging.info(f"Saving checkpoint after {processed_count} events: {checkpoint_file}")
-                        with open(checkpoint_file, 'w') as f:
-                            json.dump(updated_data, f, indent=2)
+                        # Only the file write is offloaded: orjson holds the GIL for the whole encode, so the
+                        # loop still stalls while it runs (which also keeps other tasks from mutating updated_data)
+                        await asyncio.to_thread(_write_json, checkpoint_file, updated_data)
                         
                         # Remove old checkpoints (keep last 3)
-                        checkpoint_files = sorted([f for f in os.listdir(checkpoint_dir) if f.startswith('checkpoint_')])
+                        checkpoint_files = sorted([f for f in os.listdir(checkpoint_dir) if f.startswith('checkpoint_') and f.endswith('.json')])
                         for old_checkpoint in checkpoint_files[:-3]:
                             os.remove(os.path.join(checkpoint_dir, old_checkpoint))
-                            
+                        
                 except Exception as e:
                     logging.error(f"Failed to process {event['url']}: {str(e)}")
                 finally:
                     pbar.update(1)
 
-        # Create tasks for all events
-        tasks = [
-            process_event(year, i, event) 
-            for year, i, event in events_to_process
-        ]
+            # Queue up all events for a fixed pool of workers, so only max_concurrent coroutines exist at once
+            queue = asyncio.Queue()
+            for item in events_to_process:
+                queue.put_nowait(item)
+
+            async def worker():
+                while True:
+                    year, index, event = await queue.get()
+                    try:
+                        await process_event(year, index, event)
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(max_concurrent)]
         
-        # Wait for all tasks to complete
-        await asyncio.gather(*tasks)
-        pbar.close()
+            # Wait for the queue to drain, then stop the idle workers
+            await queue.join()
+            for worker_task in workers:
+                worker_task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            pbar.close()
     
     # Save updated data
-    with open(output_file, 'w') as f:
-        json.dump(updated_data, f, indent=2)
+    await asyncio.to_thread(_write_json, output_file, updated_data)
 
 def main():
     input_file = "event_data.json"
@@ -199,13 +332,17 @@ def main():
     MAX_CONCURRENT = 10
     DELAY_BEFORE_REQUEST = 0.2
     CHECKPOINT_INTERVAL = 1000
+    MAX_RETRIES = 2
+    CACHE_DIR = "cache"
     
     # Run async process
     asyncio.run(process_events_data(input_file, 
                                     output_file, 
                                     max_concurrent=MAX_CONCURRENT, 
                                     delay_before_request=DELAY_BEFORE_REQUEST, 
-                                    checkpoint_interval=CHECKPOINT_INTERVAL))
+                                    checkpoint_interval=CHECKPOINT_INTERVAL,
+                                    max_retries=MAX_RETRIES,
+                                    cache_dir=CACHE_DIR))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
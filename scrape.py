@@ -1,22 +1,34 @@
-import requests
+import aiohttp
+import asyncio
 from urllib.parse import urljoin
-import time
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 import json
 
-def get_year_options():
+# Resolve the lxml tree builder once instead of looking up the 'lxml' feature on every parse
+LXML_BUILDER = builder_registry.lookup('lxml')
+
+# Only build the parts of each page we actually read
+YEAR_SELECT_STRAINER = SoupStrainer('select', id='year-select')
+EVENTS_TABLE_STRAINER = SoupStrainer('table', id='datatable_events')
+
+async def get_year_options(session):
     """
     Fetch webpage and extract year options from the select element
     
+    Args:
+        session (aiohttp.ClientSession): Shared HTTP session
+        
     Returns:
         list: List of year values
     """
     # Fetch the webpage
-    response = requests.get(base_url)
-    response.raise_for_status()  # Raise an exception for bad status codes
+    async with session.get(base_url) as response:
+        response.raise_for_status()  # Raise an exception for bad status codes
+        html_content = await response.read()
     
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html_content, builder=LXML_BUILDER, parse_only=YEAR_SELECT_STRAINER)
     
     # Find the select element by its id
     select_element = soup.find('select', id='year-select')
@@ -26,11 +38,12 @@ def get_year_options():
     
     return years
 
-def get_event_links_for_year(year):
+async def get_event_links_for_year(session, year):
     """
     Fetch all event links for a specific year
     
     Args:
+        session (aiohttp.ClientSession): Shared HTTP session
         year (str): Year to fetch events for
         
     Returns:
@@ -38,24 +51,49 @@ def get_event_links_for_year(year):
     """
     year_url = f"{base_url}?year={year}"
     print(f"Fetching events for {year} from {year_url}")
-    response = requests.get(year_url)
-    response.raise_for_status()
+    async with session.get(year_url) as response:
+        response.raise_for_status()
+        html_content = await response.read()
+    
+    return extract_links_from_html(html_content, base_url)
+
+async def get_all_event_data(testing=False):
+    """
+    Fetch the year options, then the events for every year concurrently
+    
+    Args:
+        testing (bool): Only fetch the first 5 years
+        
+    Returns:
+        dict: Mapping of year to its list of events
+    """
+    # Per-host connection limit keeps the load on the server polite without serializing requests
+    connector = aiohttp.TCPConnector(limit_per_host=5)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        years = await get_year_options(session)
+        print("Available years:", years)
+        if testing:
+            years = years[:5]  # Limit to 5 years for testing
+        
+        events_per_year = await asyncio.gather(
+            *(get_event_links_for_year(session, year) for year in years)
+        )
     
-    return extract_links_from_html(response.text, base_url)
+    return dict(zip(years, events_per_year))
 
 def extract_links_from_html(html_content, base_url):
     """
     Extracts event information from HTML content and constructs event data objects.
 
     Args:
-        html_content (str): The HTML content as a string.
+        html_content (str | bytes): The HTML content.
         base_url (str): The base URL to use for constructing full URLs.
 
     Returns:
         list: A list of event dictionaries containing URL, date, venue, band, and other info
     """
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, builder=LXML_BUILDER, parse_only=EVENTS_TABLE_STRAINER)
         
         # Find the events table
         table = soup.find('table', id='datatable_events')
@@ -68,21 +106,29 @@ def extract_links_from_html(html_content, base_url):
         for row in table.find('tbody').find_all('tr'):
             cells = row.find_all('td')
             if len(cells) >= 7:  # Ensure we have all needed cells
+                # Look up each cell's anchor/span once rather than once per use
+                span0 = cells[0].find('span')
+                a0 = cells[0].find('a')
+                a1 = cells[1].find('a')
+                a2 = cells[2].find('a')
+                venue_name, band_name, songs, category, act_type, show_id = (
+                    cell.text.strip() for cell in cells[1:7]
+                )
                 event = {
-                    'date': cells[0].find('span').text.strip() if cells[0].find('span') else '',
-                    'url': urljoin(base_url, cells[0].find('a')['href']) if cells[0].find('a') else '',
+                    'date': span0.text.strip() if span0 else '',
+                    'url': urljoin(base_url, a0['href']) if a0 else '',
                     'venue': {
-                        'name': cells[1].text.strip(),
-                        'url': urljoin(base_url, cells[1].find('a')['href']) if cells[1].find('a') else ''
+                        'name': venue_name,
+                        'url': urljoin(base_url, a1['href']) if a1 else ''
                     },
                     'band': {
-                        'name': cells[2].text.strip(),
-                        'url': urljoin(base_url, cells[2].find('a')['href']) if cells[2].find('a') else ''
+                        'name': band_name,
+                        'url': urljoin(base_url, a2['href']) if a2 else ''
                     },
-                    'songs': cells[3].text.strip(),
-                    'category': cells[4].text.strip(),
-                    'act_type': cells[5].text.strip(),
-                    'show_id': cells[6].text.strip()
+                    'songs': songs,
+                    'category': category,
+                    'act_type': act_type,
+                    'show_id': show_id
                 }
                 events.append(event)
         
@@ -99,20 +145,10 @@ if __name__ == "__main__":
     TESTING = False
 
     # Execute and print results
+    all_event_data = {}
     try:
-        years = get_year_options()
-        print("Available years:", years)
-        
-        # Fetch event data for each year
-        all_event_data = {}
-        for i, year in enumerate(years):
-            if TESTING and i >= 5:
-                break  # Limit to 5 iterations for testing
-            print(f"Fetching events for {year}...")
-            events = get_event_links_for_year(year)
-            all_event_data[year] = events
-            print(f"Found {len(events)} events for {year}")
-            time.sleep(0.5)  # Add a delay to avoid overwhelming the server
+        # Fetch event data for all years concurrently
+        all_event_data = asyncio.run(get_all_event_data(testing=TESTING))
             
         # Save results to JSON file
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -120,7 +156,7 @@ if __name__ == "__main__":
         
         print(f"\nEvent data has been saved to {output_file}")
             
-    except requests.RequestException as e:
+    except aiohttp.ClientError as e:
         print(f"Error fetching data: {e}")
     except AttributeError as e:
         print(f"Error parsing HTML: {e}")